@@ -0,0 +1,87 @@
+# api.py
+"""
+In-process planning API.
+
+plan_route() plans a route from Delivery objects or plain coordinate
+arrays and returns a RouteResult. Nothing is written unless route_file /
+route_img / report_dir are given. The only file read is the speed
+profiles CSV, once per process, the first time a mode is given by name.
+
+Nothing here touches module-level state, so separate calls can run
+concurrently in threads:
+
+    from CourierOptimizer.api import plan_route
+
+    result = plan_route(latitudes=[59.91, 59.93], longitudes=[10.75, 10.72])
+    result.route, result.total_time_h
+"""
+from typing import Optional, Sequence, Tuple, Union
+
+from CourierOptimizer.config import OSLO_S_LAT, OSLO_S_LON
+from CourierOptimizer.delivery import Delivery
+from CourierOptimizer.planner import RoutPlanner, RouteResult
+from CourierOptimizer.report import write_report
+from CourierOptimizer.transport_mode import BaseTransportMode, get_mode
+
+
+def deliveries_from_arrays(latitudes, longitudes,
+                           priorities: Optional[Sequence[str]] = None,
+                           names: Optional[Sequence[str]] = None,
+                           weights: Optional[Sequence[float]] = None):
+    """
+    Build Delivery objects from parallel sequences (lists or numpy arrays).
+
+    Priorities default to "Medium", names to "stop 1", "stop 2", ... and
+    weights to 0 kg. Raises ValueError on invalid values or mismatched
+    lengths.
+    """
+    n = len(latitudes)
+    if len(longitudes) != n:
+        raise ValueError("latitudes and longitudes must have the same length")
+    priorities = ["Medium"] * n if priorities is None else list(priorities)
+    names = [f"stop {i}" for i in range(1, n + 1)] if names is None else list(names)
+    weights = [0.0] * n if weights is None else list(weights)
+    if not len(priorities) == len(names) == len(weights) == n:
+        raise ValueError("all input sequences must have the same length")
+    return [
+        Delivery(names[i], latitudes[i], longitudes[i], priorities[i], weights[i])
+        for i in range(n)
+    ]
+
+
+def plan_route(deliveries: Optional[Sequence[Delivery]] = None, *,
+               latitudes=None, longitudes=None, priorities=None, names=None,
+               weights=None,
+               mode: Union[str, BaseTransportMode] = "car",
+               strategy: str = "FASTEST",
+               depot: Tuple[float, float] = (OSLO_S_LAT, OSLO_S_LON),
+               route_file=None, route_img=None, report_dir=None,
+               **planner_options) -> RouteResult:
+    """
+    Plan a route in memory and return a RouteResult.
+
+    Either pass `deliveries`, or `latitudes`/`longitudes` (with optional
+    `priorities`, `names` and `weights` in kg). `mode` is a mode name (car / bike / walk,
+    with its speed profile) or a BaseTransportMode. Extra keyword
+    arguments go to RoutPlanner (starts, seed, time_budget, depart_hour,
+    ...). The CSV, plot and run report (see report.py) are only written
+    when route_file / route_img / report_dir are given.
+    """
+    if deliveries is None:
+        if latitudes is None or longitudes is None:
+            raise ValueError("pass deliveries or latitudes and longitudes")
+        deliveries = deliveries_from_arrays(latitudes, longitudes,
+                                            priorities, names, weights)
+    if isinstance(mode, str):
+        mode = get_mode(mode)
+
+    planner = RoutPlanner(mode, strategy, lat=depot[0], lon=depot[1],
+                          orders=deliveries, **planner_options)
+    result = planner.plan()
+    if route_file is not None and result.rows:
+        result.write_csv(route_file)
+    if route_img is not None and result.rows:
+        result.write_plot(route_img)
+    if report_dir is not None:
+        write_report(result, report_dir)
+    return result
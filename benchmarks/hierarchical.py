@@ -0,0 +1,78 @@
+# benchmarks/hierarchical.py
+"""
+Hierarchical vs flat planner on random benchmark sets.
+
+Generates uniformly random stops around Oslo, plans them with the flat
+greedy planner (only up to --flat-limit stops, since it needs n x n
+matrices) and with the hierarchical planner, and prints runtime, tour
+length, total time and the priority-weighted objective both planners
+minimise (RoutPlanner.route_objective), with its hierarchical / flat ratio.
+
+Usage:
+    python -m CourierOptimizer.benchmarks.hierarchical [--sizes 1000 5000 100000]
+        [--strategy FASTEST|CHEAPEST|LOWEST_CO2]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from CourierOptimizer.api import deliveries_from_arrays, plan_route
+from CourierOptimizer.config import HIERARCHICAL_CELL_SIZE
+from CourierOptimizer.planner import RoutPlanner
+from CourierOptimizer.transport_mode import get_mode
+
+DEFAULT_SIZES = (1000, 2000, 5000, 20000, 100000)
+
+
+def random_stops(n: int, seed: int = 0):
+    """Random stops in a 0.3 x 0.5 degree box around central Oslo."""
+    rng = np.random.default_rng([seed, n])
+    lats = 59.80 + rng.random(n) * 0.30
+    lons = 10.50 + rng.random(n) * 0.50
+    priorities = rng.choice(["High", "Medium", "Low"], size=n)
+    return lats, lons, priorities
+
+
+def _run(deliveries, **options):
+    start = time.perf_counter()
+    result = plan_route(deliveries, **options)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cell-size", type=int, default=HIERARCHICAL_CELL_SIZE)
+    parser.add_argument("--flat-limit", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--strategy", default="FASTEST",
+                        choices=["FASTEST", "CHEAPEST", "LOWEST_CO2"])
+    args = parser.parse_args(argv)
+
+    print(f"{'stops':>8} {'planner':>12} {'time s':>8} {'km':>10} {'time h':>8} "
+          f"{'objective':>12} {'vs flat':>8}")
+    for n in args.sizes:
+        deliveries = deliveries_from_arrays(*random_stops(n))
+        # scores routes with the objective the planners minimise, without
+        # building any n x n matrix
+        scorer = RoutPlanner(get_mode("car"), args.strategy, orders=deliveries)
+        flat_score = None
+        if n <= args.flat_limit:
+            elapsed, flat = _run(deliveries, strategy=args.strategy)
+            flat_score = scorer.route_objective(flat.route)
+            print(f"{n:>8} {'flat':>12} {elapsed:>8.2f} "
+                  f"{flat.total_distance_km:>10.1f} {flat.total_time_h:>8.2f} "
+                  f"{flat_score:>12.6g} {'':>8}")
+        elapsed, hier = _run(deliveries, strategy=args.strategy,
+                             cell_size=args.cell_size, workers=args.workers)
+        hier_score = scorer.route_objective(hier.route)
+        ratio = f"{hier_score / flat_score:>8.3f}" if flat_score else f"{'-':>8}"
+        print(f"{n:>8} {'hierarchical':>12} {elapsed:>8.2f} "
+              f"{hier.total_distance_km:>10.1f} {hier.total_time_h:>8.2f} "
+              f"{hier_score:>12.6g} {ratio}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,90 @@
+# benchmarks/import_time.py
+"""
+Start-up benchmark for the CLI entry point.
+
+Measures the wall time of `import CourierOptimizer.cli` in fresh
+interpreters, subtracts the cost of an empty interpreter, and fails
+(exit code 1) when the median overhead exceeds the budget or when a
+heavy dependency is imported eagerly.
+
+Usage:
+    python -m CourierOptimizer.benchmarks.import_time [--runs N] [--budget-ms MS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("numpy", "matplotlib")
+DEFAULT_BUDGET_MS = 150.0
+
+_PROBE = (
+    "import sys, CourierOptimizer.cli; "
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def _child_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in sys.path if p)
+    return env
+
+
+def _time_command(code: str, env) -> tuple:
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return time.perf_counter() - start, out.strip()
+
+
+def measure(runs: int = 10) -> dict:
+    """
+    Return median start-up times in milliseconds and the heavy modules
+    that were imported by `import CourierOptimizer.cli`.
+    """
+    env = _child_env()
+    code = _PROBE.format(heavy=HEAVY_MODULES)
+    baseline, package = [], []
+    eager = ""
+    for _ in range(runs):
+        baseline.append(_time_command("pass", env)[0])
+        elapsed, eager = _time_command(code, env)
+        package.append(elapsed)
+    base_ms = statistics.median(baseline) * 1000
+    pkg_ms = statistics.median(package) * 1000
+    return {
+        "baseline_ms": base_ms,
+        "import_ms": pkg_ms,
+        "overhead_ms": pkg_ms - base_ms,
+        "eager_modules": [m for m in eager.split(",") if m],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    print(f"empty interpreter: {result['baseline_ms']:.1f} ms")
+    print(f"import cli:        {result['import_ms']:.1f} ms")
+    print(f"overhead:          {result['overhead_ms']:.1f} ms "
+          f"(budget {args.budget_ms:.1f} ms)")
+
+    ok = True
+    if result["eager_modules"]:
+        print(f"FAIL: imported at start-up: {', '.join(result['eager_modules'])}")
+        ok = False
+    if result["overhead_ms"] > args.budget_ms:
+        print("FAIL: start-up overhead over budget")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
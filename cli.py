@@ -1,17 +1,20 @@
-from dataclasses import dataclass, field
-from typing import Optional
+import argparse
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional
 
 from CourierOptimizer import config as cfg
 from CourierOptimizer import orders
 from CourierOptimizer.planner import RoutPlanner
-from CourierOptimizer.transport_mode import car, bike, walk
-from CourierOptimizer.log import get_logger
+from CourierOptimizer.report import Telemetry, write_report
+from CourierOptimizer.transport_mode import get_mode
+from CourierOptimizer.log import configure_run_log, get_logger
 
 
 @dataclass
 class Settings:
     """Holds current CLI settings."""
-    orders_path: str = field(default_factory=lambda: orders.ORDERS_FILE)
+    orders_path: str = field(default_factory=lambda: str(orders.ORDERS_FILE))
     mode: str = "car"              # car / bike / walk
     objective: str = "FASTEST"     # FASTEST / CHEAPEST / LOWEST_CO2
     depot_lat: Optional[float] = field(
@@ -20,6 +23,11 @@ class Settings:
     depot_lon: Optional[float] = field(
         default_factory=lambda: cfg.OSLO_S_LON
     )
+    starts: int = 1                # 1 = single greedy tour
+    seed: int = field(default_factory=lambda: cfg.MULTISTART_SEED)
+    time_budget: Optional[float] = None  # seconds, multi-start only
+    depart_hour: float = field(default_factory=lambda: cfg.DEPART_HOUR)
+    cell_size: Optional[int] = None  # hierarchical mode for larger days
 
 
 def print_menu(settings: Settings) -> None:
@@ -33,15 +41,30 @@ def print_menu(settings: Settings) -> None:
     else:
         depot_str = "NOT SET"
     print(f"Depot coordinates:   {depot_str}")
+    print(f"Departure time:      {format_hour(settings.depart_hour)}")
+    if settings.starts > 1:
+        budget_str = (f"{settings.time_budget:g} s"
+                      if settings.time_budget is not None else "none")
+        print(f"Multi-start:         {settings.starts} runs, "
+              f"seed {settings.seed}, budget {budget_str}")
+    else:
+        print("Multi-start:         off")
     print("---------------------------------------")
     print("1) Change orders file")
     print("2) Choose transport mode (car / bike / walk)")
     print("3) Choose objective (FASTEST / CHEAPEST / LOWEST_CO2)")
-    print("4) Change depot coordinates")
+    print("4) Change depot coordinates and departure time")
     print("5) Run optimization")
+    print("6) Multi-start settings")
     print("0) Exit")
 
 
+def format_hour(hour: float) -> str:
+    """Format hours after midnight as HH:MM."""
+    minutes = round(hour * 60)
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
 def input_non_empty(prompt: str) -> str:
     """Prompt until a non-empty string is entered."""
     while True:
@@ -61,6 +84,39 @@ def input_float(prompt: str) -> float:
             print("Please enter a valid number (e.g., 59.91).")
 
 
+def input_int(prompt: str, minimum: int = 0) -> int:
+    """Prompt until a whole number >= minimum is entered."""
+    while True:
+        value = input(prompt).strip()
+        try:
+            number = int(value)
+        except ValueError:
+            print("Please enter a whole number (e.g., 8).")
+            continue
+        if number >= minimum:
+            return number
+        print(f"Please enter a number >= {minimum}.")
+
+
+def choose_multistart(settings: Settings) -> None:
+    """Interactive multi-start settings (number of runs, seed, time budget)."""
+    print("\nMulti-start builds several randomized greedy tours "
+          "and keeps the best one.")
+    settings.starts = input_int("Number of runs (1 = off): ", minimum=1)
+    if settings.starts == 1:
+        return
+    settings.seed = input_int("Random seed: ")
+    budget = input("Time budget in seconds (empty = none): ").strip()
+    while budget:
+        try:
+            settings.time_budget = float(budget)
+            break
+        except ValueError:
+            budget = input("Please enter a number or leave empty: ").strip()
+    else:
+        settings.time_budget = None
+
+
 def choose_mode() -> str:
     """Interactive selection of transport mode."""
     print("\nChoose transport mode:")
@@ -95,85 +151,238 @@ def choose_objective() -> str:
         print("Invalid choice, please enter 1, 2 or 3.")
 
 
-def _get_mode_object(mode_name: str):
-    """Map mode name to transport mode object."""
-    if mode_name == "car":
-        return car
-    if mode_name == "bike":
-        return bike
-    if mode_name == "walk":
-        return walk
-    raise ValueError(f"Unknown transport mode: {mode_name}")
-
+def execute(settings: Settings) -> Optional[dict]:
+    """
+    Run the route optimization with the given settings and generate the plot.
 
-def run_optimization(settings: Settings) -> None:
-    """Run the route optimization with current settings and generate plot."""
+    Returns a summary dict with the route totals and output paths, or None
+    when no route could be built. Used by the menu and by the worker.
+    """
     logger = get_logger()
 
-    if settings.depot_lat is None or settings.depot_lon is None:
-        print("Please change depot coordinates first (menu option 4).")
-        return
-
-    # Make sure orders.get_orders() uses the chosen file
-    orders.ORDERS_FILE = settings.orders_path
-
     logger.info(
-        "RUN START mode=%s objective=%s depot=(%f,%f) orders_file=%s",
+        "RUN START mode=%s objective=%s depot=(%f,%f) orders_file=%s starts=%d",
         settings.mode,
         settings.objective,
         settings.depot_lat,
         settings.depot_lon,
         settings.orders_path,
+        settings.starts,
     )
 
-    mode_obj = _get_mode_object(settings.mode)
+    mode_obj = get_mode(settings.mode)
+    telemetry = Telemetry()
+    with telemetry.stage("load_orders"):
+        deliveries = orders.get_orders(settings.orders_path)
 
     planner = RoutPlanner(
         mode=mode_obj,
         strategy=settings.objective,
         lat=settings.depot_lat,
         lon=settings.depot_lon,
+        starts=settings.starts,
+        seed=settings.seed,
+        time_budget=settings.time_budget,
+        depart_hour=settings.depart_hour,
+        cell_size=settings.cell_size,
+        orders=deliveries,
+        telemetry=telemetry,
     )
 
-    rows = planner.gen_route()
-
-    if not rows:
-        print("No valid route generated.")
-        logger.warning("No route rows returned from gen_route()")
-        return
+    result = planner.plan()
+
+    if not result.rows:
+        logger.warning("No route rows returned from plan()")
+        return None
+
+    with telemetry.stage("write_csv"):
+        result.write_csv(cfg.ROUTE_FILE)
+    with telemetry.stage("write_plot"):
+        result.write_plot(cfg.ROUTE_IMG)
+    report_json, report_html = write_report(result, cfg.ROUTE_FILE.parent,
+                                            cfg.REPORT_HISTORY_FILE)
+
+    summary = {
+        "mode": settings.mode,
+        "objective": settings.objective,
+        "stops": len(result.rows),
+        "total_distance_km": result.total_distance_km,
+        "total_time_h": result.total_time_h,
+        "total_cost_nok": result.total_cost_nok,
+        "total_co2_g": result.total_co2_g,
+        "route_file": str(cfg.ROUTE_FILE),
+        "route_img": str(cfg.ROUTE_IMG),
+        "report_html": str(report_html),
+        "report_json": str(report_json),
+    }
 
-    planner.plot_route()
+    logger.info(
+        "RUN END total_distance=%.3f total_time=%.3f total_cost=%.2f total_co2=%.1f",
+        summary["total_distance_km"],
+        summary["total_time_h"],
+        summary["total_cost_nok"],
+        summary["total_co2_g"],
+    )
+    return summary
 
-    last = rows[-1]
-    total_distance = last.get("cumulative_distance_km", 0.0)
-    total_time = last.get("eta_hours", 0.0)
-    total_cost = sum(r.get("cost_leg_nok", 0.0) for r in rows)
-    total_co2 = sum(r.get("co2_leg_g", 0.0) for r in rows)
 
+def print_summary(summary: dict) -> None:
+    """Print the route summary returned by execute()."""
     print("\n=== Route summary ===")
-    print(f"Transport mode: {settings.mode}")
-    print(f"Objective:      {settings.objective}")
-    print(f"Total distance: {total_distance:.2f} km")
-    print(f"Total time:     {total_time:.2f} h")
-    print(f"Total cost:     {total_cost:.2f} NOK")
-    print(f"Total CO2:      {total_co2:.2f} g")
-
-    print(f"\nRoute CSV:  {cfg.ROUTE_FILE}")
+    print(f"Transport mode: {summary['mode']}")
+    print(f"Objective:      {summary['objective']}")
+    print(f"Total distance: {summary['total_distance_km']:.2f} km")
+    print(f"Total time:     {summary['total_time_h']:.2f} h")
+    print(f"Total cost:     {summary['total_cost_nok']:.2f} NOK")
+    print(f"Total CO2:      {summary['total_co2_g']:.2f} g")
+
+    print(f"\nRoute CSV:  {summary['route_file']}")
     print("Log file:    run.log")
-    print(f"Route plot:  {cfg.ROUTE_IMG}")
+    print(f"Route plot:  {summary['route_img']}")
+    print(f"Run report:  {summary['report_html']}")
 
-    logger.info(
-        "RUN END total_distance=%.3f total_time=%.3f total_cost=%.2f total_co2=%.1f",
-        total_distance,
-        total_time,
-        total_cost,
-        total_co2,
+
+def run_optimization(settings: Settings) -> bool:
+    """
+    Run the route optimization with current settings and print a summary.
+
+    Returns False when no route was generated.
+    """
+    if settings.depot_lat is None or settings.depot_lon is None:
+        print("Please change depot coordinates first (menu option 4).")
+        return False
+
+    summary = execute(settings)
+    if summary is None:
+        print("No valid route generated.")
+        return False
+    print_summary(summary)
+    return True
+
+
+def positive_int(value: str) -> int:
+    """argparse type for whole numbers >= 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line options; no options means the interactive menu."""
+    parser = argparse.ArgumentParser(
+        prog="CourierOptimizer",
+        description="Plan a courier route. Without options, starts the menu.",
+    )
+    parser.add_argument("--orders", help="path to orders CSV")
+    parser.add_argument("--mode", choices=["car", "bike", "walk"])
+    parser.add_argument(
+        "--objective", choices=["FASTEST", "CHEAPEST", "LOWEST_CO2"]
     )
+    parser.add_argument(
+        "--depot", nargs=2, type=float, metavar=("LAT", "LON"),
+        help="depot coordinates",
+    )
+    parser.add_argument(
+        "--starts", type=positive_int, help="number of multi-start runs (1 = off)"
+    )
+    parser.add_argument("--seed", type=int, help="multi-start random seed")
+    parser.add_argument(
+        "--time-budget", type=float, metavar="SECONDS",
+        help="wall-clock budget for multi-start",
+    )
+    parser.add_argument(
+        "--depart-hour", type=float, metavar="HOUR",
+        help="departure time in hours after midnight (e.g., 8.5)",
+    )
+    parser.add_argument(
+        "--hierarchical", nargs="?", type=positive_int, metavar="CELL_SIZE",
+        const=cfg.HIERARCHICAL_CELL_SIZE, dest="cell_size",
+        help="route large days cell by cell "
+             f"(default cell size {cfg.HIERARCHICAL_CELL_SIZE})",
+    )
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument(
+        "--run", action="store_true",
+        help="run one optimization and exit (no menu)",
+    )
+    action.add_argument(
+        "--worker", metavar="SOCKET",
+        help="serve jobs on a Unix socket with a warm interpreter",
+    )
+    action.add_argument(
+        "--submit", metavar="SOCKET",
+        help="send the job to a running worker and print its summary",
+    )
+    return parser.parse_args(argv)
 
 
-def main() -> None:
-    """Main loop for the console menu."""
+def settings_from_args(args: argparse.Namespace) -> Settings:
+    """Build Settings from parsed options, keeping defaults for the rest."""
     settings = Settings()
+    if args.orders:
+        settings.orders_path = args.orders
+    if args.mode:
+        settings.mode = args.mode
+    if args.objective:
+        settings.objective = args.objective
+    if args.depot:
+        settings.depot_lat, settings.depot_lon = args.depot
+    if args.starts is not None:
+        settings.starts = args.starts
+    if args.seed is not None:
+        settings.seed = args.seed
+    if args.time_budget is not None:
+        settings.time_budget = args.time_budget
+    if args.depart_hour is not None:
+        settings.depart_hour = args.depart_hour % 24
+    if args.cell_size is not None:
+        settings.cell_size = args.cell_size
+    return settings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point: handle command-line options or run the console menu.
+
+    Returns the process exit status: 1 when --run, --worker or --submit
+    fails (so cron jobs can detect it), otherwise 0.
+    """
+    args = parse_args(argv)
+    settings = settings_from_args(args)
+    configure_run_log()
+
+    if args.worker:
+        from CourierOptimizer.worker import serve
+        try:
+            serve(args.worker)
+        except RuntimeError as e:
+            print(f"Cannot start worker: {e}")
+            return 1
+        return 0
+    if args.submit:
+        from CourierOptimizer.worker import submit
+        job = asdict(settings)
+        # the worker may run in another directory
+        job["orders_path"] = str(Path(settings.orders_path).resolve())
+        try:
+            response = submit(args.submit, job)
+        except OSError as e:
+            print(f"Cannot reach worker on {args.submit}: {e}")
+            return 1
+        if not response.get("ok"):
+            print(f"Worker error: {response.get('error')}")
+            return 1
+        if response.get("summary") is None:
+            print("No valid route generated.")
+            return 1
+        print_summary(response["summary"])
+        return 0
+    if args.run:
+        return 0 if run_optimization(settings) else 1
 
     while True:
         print_menu(settings)
@@ -189,10 +398,13 @@ def main() -> None:
             print("\nChange depot coordinates:")
             settings.depot_lat = input_float("Latitude:  ")
             settings.depot_lon = input_float("Longitude: ")
+            settings.depart_hour = input_float("Departure hour (e.g., 8.5): ") % 24
         elif choice == "5":
             run_optimization(settings)
+        elif choice == "6":
+            choose_multistart(settings)
         elif choice == "0":
             print("Exiting CourierOptimizer.")
-            break
+            return 0
         else:
             print("Unknown option, please try again.")
@@ -10,7 +10,21 @@ REJECTED_ORDERS = FILES_DIR / "rejected.csv"
 RUN_LOG_FILE = FILES_DIR / "run.log"
 ROUTE_FILE = FILES_DIR / "route.csv"
 ROUTE_IMG = FILES_DIR / "route.png"
+# append-only store of per-run report records (report.html/.json sit next to it)
+REPORT_HISTORY_FILE = FILES_DIR / "report_history.jsonl"
 
 
 OSLO_S_LAT = 59.9100
 OSLO_S_LON = 10.7500
+
+# multi-start construction: next stop drawn among the top-k cheapest ones
+MULTISTART_TOP_K = 3
+MULTISTART_SEED = 0
+
+# hourly speed multipliers per transport mode (mode,hour,multiplier)
+SPEED_PROFILES_FILE = FILES_DIR / "speed_profiles.csv"
+# default departure time from the depot, hours after midnight
+DEPART_HOUR = 8.0
+
+# hierarchical mode: maximum number of stops routed together in one cell
+HIERARCHICAL_CELL_SIZE = 500
@@ -17,3 +17,15 @@ def haver_dist(lati1, long1, lati2, long2):
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     distance = R * c
     return distance
+
+
+def haver_dist_array(lati1, long1, lati2, long2):
+    """Vectorised haver_dist: arguments are broadcast numpy arrays."""
+    import numpy as np
+
+    lati1, long1, lati2, long2 = map(np.radians, (lati1, long1, lati2, long2))
+    a = (
+            np.sin((lati2 - lati1) / 2) ** 2
+            + np.cos(lati1) * np.cos(lati2) * np.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
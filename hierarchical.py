@@ -0,0 +1,235 @@
+# hierarchical.py
+"""
+Clustering-first routing for very large days (100k+ stops).
+
+A flat greedy tour needs the full n x n strategy matrix, which is too
+slow and too large for big n. The hierarchical planner instead:
+
+  1. splits the stops into cells of at most `cell_size` stops by recursive
+     median splits of the longer side of the bounding box (a k-d tree
+     whose leaves are the cells), so every cell is bounded in size;
+  2. orders the cells with a greedy tour over their centroids, starting
+     from the depot;
+  3. routes every cell independently (in a process pool), entering it at
+     the stop closest to the previous cell's centroid;
+  4. stitches the cell tours and smooths every boundary with a small
+     2-opt pass over the stops on both sides.
+
+Work and memory are O(cell_size^2) per cell, so the total runtime is
+close to linear in n for a fixed cell size.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from CourierOptimizer.distance import haver_dist_array
+from CourierOptimizer.log import get_logger
+from CourierOptimizer.multistart import greedy_tour, process_context
+
+logger = get_logger()
+
+# stops on each side of a cell boundary that the 2-opt pass may reorder
+SMOOTHING_WINDOW = 8
+
+
+def split_cells(lats, lons, cell_size: int) -> List[np.ndarray]:
+    """
+    Return index arrays of cells with at most cell_size stops each.
+
+    Raises ValueError if cell_size is smaller than 1.
+    """
+    if cell_size < 1:
+        raise ValueError("cell_size must be at least 1")
+    cells = []
+    pending = [np.arange(len(lats))]
+    # longitude degrees are shorter than latitude degrees away from the equator
+    lon_scale = np.cos(np.radians(np.mean(lats))) if len(lats) else 1.0
+    while pending:
+        idx = pending.pop()
+        if len(idx) <= cell_size:
+            cells.append(idx)
+            continue
+        # split the longer side of the bounding box at its median
+        lat_span = np.ptp(lats[idx])
+        lon_span = np.ptp(lons[idx]) * lon_scale
+        values = lats[idx] if lat_span >= lon_span else lons[idx]
+        order = idx[np.argsort(values, kind="stable")]
+        half = len(order) // 2
+        pending.append(order[half:])
+        pending.append(order[:half])
+    return cells
+
+
+def _cell_matrix(lats, lons, weights, compute):
+    dist = haver_dist_array(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+    np.fill_diagonal(dist, np.nan)
+    return compute(dist) * weights[None, :]
+
+
+def _route_cell(lats, lons, weights, compute, ref_lat, ref_lon) -> List[int]:
+    """Greedy tour of one cell, entered at the stop closest to (ref_lat, ref_lon)."""
+    entry = int(np.argmin(haver_dist_array(ref_lat, ref_lon, lats, lons)))
+    if len(lats) == 1:
+        return [0]
+    matrix = _cell_matrix(lats, lons, weights, compute)
+    return greedy_tour(matrix, entry)
+
+
+def _route_cell_job(args):
+    return _route_cell(*args)
+
+
+def _leg_distances(route, lats, lons, depot_lat: float, depot_lon: float):
+    """Distances (km) of the legs driven to each stop of route, depot first."""
+    route = np.asarray(route, dtype=int)
+    from_lats = np.concatenate(([depot_lat], lats[route]))[:-1]
+    from_lons = np.concatenate(([depot_lon], lons[route]))[:-1]
+    return haver_dist_array(from_lats, from_lons, lats[route], lons[route])
+
+
+def _smooth(route: np.ndarray, lo: int, hi: int, lats, lons, weights, compute,
+            eta=None, start_km: float = 0.0) -> float:
+    """
+    Improve route[lo:hi] in place with 2-opt and return the change in its
+    length (km).
+
+    The first and last stop of the window stay fixed, so the rest of the
+    route is not affected. With `eta`, the window is scored by time-of-day
+    travel times, starting start_km into the route.
+    """
+    segment = route[lo:hi]
+    if len(segment) < 4:
+        return 0.0
+    seg_lats, seg_lons = lats[segment], lons[segment]
+    dist = haver_dist_array(seg_lats[:, None], seg_lons[:, None],
+                            seg_lats[None, :], seg_lons[None, :])
+    seg_weights = weights[segment]
+    path = np.arange(len(segment))
+
+    if eta is None:
+        matrix = compute(dist) * seg_weights[None, :]
+
+        def cost(p):
+            return matrix[p[:-1], p[1:]].sum()
+    else:
+        start_eta = eta(np.array([start_km]))[0]
+
+        def cost(p):
+            arrival = eta(start_km + np.cumsum(dist[p[:-1], p[1:]]))
+            times = np.diff(arrival, prepend=start_eta)
+            return (times * seg_weights[p[1:]]).sum()
+
+    length = dist[path[:-1], path[1:]].sum()
+    best = cost(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(path) - 2):
+            for j in range(i + 1, len(path) - 1):
+                candidate = path.copy()
+                candidate[i:j + 1] = candidate[i:j + 1][::-1]
+                value = cost(candidate)
+                if value < best - 1e-12:
+                    path, best, improved = candidate, value, True
+    route[lo:hi] = segment[path]
+    return float(dist[path[:-1], path[1:]].sum() - length)
+
+
+def route_score(route, lats, lons, weights, compute,
+                depot_lat: float, depot_lon: float, eta=None) -> float:
+    """
+    Priority-weighted objective value of a route, without any matrix.
+
+    With `eta` (cumulative km -> elapsed hours), legs are timed at the
+    time of day they are driven instead of with `compute`.
+    """
+    route = np.asarray(route, dtype=int)
+    legs = _leg_distances(route, lats, lons, depot_lat, depot_lon)
+    if eta is None:
+        values = compute(legs)
+    else:
+        values = np.diff(eta(np.cumsum(legs)), prepend=0.0)
+    return float((values * weights[route]).sum())
+
+
+def hierarchical_route(lats, lons, weights, compute, depot_lat: float,
+                       depot_lon: float, cell_size: int,
+                       workers: Optional[int] = None,
+                       window: int = SMOOTHING_WINDOW,
+                       stats: Optional[dict] = None,
+                       eta=None) -> List[int]:
+    """
+    Return a route (order indices in visiting order) built cell by cell.
+
+    `compute` maps distances (km) to objective values, as
+    RoutPlanner.compute; it must be picklable when workers > 1.
+    `eta` (cumulative km -> elapsed hours, see RoutPlanner.eta_objective)
+    makes boundary smoothing compare time-of-day travel times.
+    If `stats` is a dict, it is filled with the number of cells and the
+    objective value before and after boundary smoothing.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    cells = split_cells(lats, lons, cell_size)
+
+    # coarse tour over the cell centroids, from the depot
+    c_lats = np.array([lats[c].mean() for c in cells])
+    c_lons = np.array([lons[c].mean() for c in cells])
+    c_depot = haver_dist_array(depot_lat, depot_lon, c_lats, c_lons)
+    c_matrix = haver_dist_array(c_lats[:, None], c_lons[:, None],
+                                c_lats[None, :], c_lons[None, :])
+    np.fill_diagonal(c_matrix, np.nan)
+    cell_order = greedy_tour(c_matrix, int(np.argmin(c_depot)))
+
+    # each cell is entered near the previous cell's centroid (the depot for
+    # the first one), so cells can be routed independently
+    jobs = []
+    ref_lat, ref_lon = depot_lat, depot_lon
+    for k in cell_order:
+        idx = cells[k]
+        jobs.append((lats[idx], lons[idx], weights[idx], compute, ref_lat, ref_lon))
+        ref_lat, ref_lon = c_lats[k], c_lons[k]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=process_context()) as pool:
+            local_routes = list(pool.map(_route_cell_job, jobs,
+                                         chunksize=max(len(jobs) // (4 * workers), 1)))
+    else:
+        local_routes = [_route_cell_job(job) for job in jobs]
+
+    route = np.concatenate([
+        cells[k][local] for k, local in zip(cell_order, local_routes)
+    ]) if cells else np.array([], dtype=int)
+
+    if stats is not None:
+        stats.update(cells=len(cells), largest_cell=max(map(len, cells), default=0),
+                     stitched_score=route_score(route, lats, lons, weights, compute,
+                                                depot_lat, depot_lon, eta))
+
+    if eta is not None:
+        arrival_km = np.cumsum(_leg_distances(route, lats, lons, depot_lat, depot_lon))
+    # Windows do not overlap (a window may start at the previous window's
+    # fixed last stop), so km travelled before a window is its original
+    # value plus the length change of all earlier windows.
+    shift = 0.0
+    prev_hi = 0
+    for boundary in np.cumsum([len(cells[k]) for k in cell_order])[:-1]:
+        lo = max(int(boundary) - window - 1, prev_hi - 1, 0)
+        hi = min(int(boundary) + window + 1, len(route))
+        start_km = arrival_km[lo] + shift if eta is not None else 0.0
+        shift += _smooth(route, lo, hi, lats, lons, weights, compute, eta, start_km)
+        prev_hi = hi
+    if stats is not None:
+        stats["smoothed_score"] = route_score(route, lats, lons, weights, compute,
+                                              depot_lat, depot_lon, eta)
+
+    logger.info(
+        "HIERARCHICAL route built (orders=%d, cells=%d, cell_size<=%d, workers=%d)",
+        len(route), len(cells), cell_size, max(workers, 1),
+    )
+    return [int(i) for i in route]
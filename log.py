@@ -4,10 +4,30 @@ from CourierOptimizer.config import RUN_LOG_FILE
 
 
 def get_logger():
+    """
+    Return the package logger.
+
+    Library code only attaches a NullHandler, so importing the package or
+    calling the API writes no log file and leaves the host application's
+    logging alone. The command-line entry points send records to run.log
+    with configure_run_log().
+    """
     logger = logging.getLogger(__name__)
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def configure_run_log(path=RUN_LOG_FILE):
+    """
+    Log INFO and above to run.log (cli.main() and worker.serve()).
+
+    The file handler is created with delay=True, so run.log is only opened
+    when the first record is written. Does nothing if the root logger is
+    already configured.
+    """
     logging.basicConfig(
-        filename=RUN_LOG_FILE,
+        handlers=[logging.FileHandler(path, delay=True)],
         level=logging.INFO,
         format="%(asctime)s - %(levelname)s - %(message)s"
     )
-    return logger
@@ -0,0 +1,197 @@
+# multistart.py
+"""
+Greedy tour construction, single- and multi-start.
+
+A tour is scored by the same priority-weighted objective the planner
+minimises: depot -> first stop value plus the strategy matrix values of
+every following leg.
+
+Multi-start builds several randomized greedy tours and keeps the best:
+  - run 0 is the plain deterministic greedy tour (best first stop, always
+    the nearest next stop), so multi-start is never worse than a single
+    greedy run;
+  - run i starts from the i-th best first stop and picks each next stop
+    at random among the top_k cheapest unvisited ones.
+
+Each run draws from its own generator seeded with (seed, run index), and
+ties between equal scores go to the lower run index, so the result does
+not depend on the number of worker processes or on completion order.
+Only a time_budget that expires before all runs finish can change it.
+
+Process pools are started with process_context() (forkserver or spawn),
+never fork: forking a process that runs other threads can deadlock the
+child, and the planner may be called from several threads at once.
+"""
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from CourierOptimizer.log import get_logger
+
+logger = get_logger()
+
+# set in each pool process by _attach_matrix()
+_shared_shm = None
+_shared_matrix = None
+
+
+def process_context():
+    """Return the multiprocessing context for process pools (no fork)."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def greedy_tour(strategy_matrix, first: int, top_k: int = 1,
+                rng=None) -> List[int]:
+    """
+    Build a greedy tour starting at order index `first`.
+
+    With top_k == 1 the cheapest unvisited stop is always taken (lowest
+    index on ties); otherwise the next stop is drawn uniformly from the
+    top_k cheapest unvisited stops using `rng`.
+    """
+    n = strategy_matrix.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    visited[first] = True
+    route = [first]
+    current = first
+
+    for remaining in range(n - 1, 0, -1):
+        row = np.where(visited, np.inf, strategy_matrix[current])
+        k = min(top_k, remaining)
+        if k <= 1:
+            next_idx = int(np.argmin(row))
+        else:
+            candidates = np.argpartition(row, k - 1)[:k]
+            # argpartition leaves the k smallest unordered; sort them so the
+            # draw only depends on the values, not on partition internals
+            candidates = candidates[np.lexsort((candidates, row[candidates]))]
+            next_idx = int(candidates[rng.integers(k)])
+        visited[next_idx] = True
+        route.append(next_idx)
+        current = next_idx
+
+    return route
+
+
+def tour_score(route: List[int], strategy_matrix, from_depot) -> float:
+    """Return the priority-weighted objective value of a tour."""
+    legs = strategy_matrix[route[:-1], route[1:]]
+    return float(from_depot[route[0]] + legs.sum())
+
+
+def _run_start(strategy_matrix, from_depot, run_index: int, first: int,
+               top_k: int, seed: int) -> Tuple[float, int, List[int]]:
+    rng = np.random.default_rng([seed, run_index])
+    k = 1 if run_index == 0 else top_k
+    route = greedy_tour(strategy_matrix, first, k, rng)
+    return tour_score(route, strategy_matrix, from_depot), run_index, route
+
+
+def _attach_matrix(name: str, shape: Tuple[int, int]) -> None:
+    """Pool initializer: map the parent's strategy matrix without copying."""
+    global _shared_shm, _shared_matrix
+    _shared_shm = shared_memory.SharedMemory(name=name)
+    _shared_matrix = np.ndarray(shape, dtype=np.float64, buffer=_shared_shm.buf)
+
+
+def _run_shared_start(from_depot, run_index, first, top_k, seed):
+    return _run_start(_shared_matrix, from_depot, run_index, first, top_k, seed)
+
+
+def multistart(strategy_matrix, from_depot, starts: int, top_k: int = 3,
+               seed: int = 0, time_budget: Optional[float] = None,
+               workers: Optional[int] = None,
+               stats: Optional[dict] = None,
+               score: Optional[Callable[[List[int]], float]] = None
+               ) -> Tuple[List[int], float]:
+    """
+    Build `starts` greedy tours and return (best_route, best_score).
+
+    Runs after the first are spread over a process pool that reads the
+    strategy matrix from shared memory. `time_budget` (seconds) bounds the
+    wall time of the whole call, pool start-up included: when it runs out,
+    the pool is terminated, unfinished runs are dropped and the best
+    finished tour is returned. Run 0 (plain greedy) always completes, and
+    with a single worker a run that has started is not interrupted.
+    If `stats` is a dict, it is filled with the greedy and best scores and
+    the number of finished runs. `score` replaces tour_score() for ranking
+    the finished tours (e.g. time-of-day travel times); it runs in this
+    process, so it need not be picklable.
+    """
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    n = len(from_depot)
+    first_stops = np.argsort(from_depot, kind="stable")
+    jobs = [(i, int(first_stops[i % n])) for i in range(1, starts)]
+
+    best = _run_start(strategy_matrix, from_depot, 0, int(first_stops[0]),
+                      top_k, seed)
+    results = [best]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    if workers <= 1:
+        for run_index, first in jobs:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            results.append(_run_start(strategy_matrix, from_depot,
+                                      run_index, first, top_k, seed))
+    else:
+        matrix = np.ascontiguousarray(strategy_matrix, dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        try:
+            np.ndarray(matrix.shape, dtype=np.float64, buffer=shm.buf)[:] = matrix
+            pool = process_context().Pool(
+                workers, initializer=_attach_matrix,
+                initargs=(shm.name, matrix.shape),
+            )
+            try:
+                pending = [
+                    pool.apply_async(_run_shared_start,
+                                     (from_depot, run_index, first, top_k, seed))
+                    for run_index, first in jobs
+                ]
+                for i, async_result in enumerate(pending):
+                    timeout = None
+                    if deadline is not None:
+                        timeout = max(deadline - time.monotonic(), 0.0)
+                    try:
+                        results.append(async_result.get(timeout))
+                    except multiprocessing.TimeoutError:
+                        # keep whatever else finished in time, drop the rest
+                        results.extend(r.get() for r in pending[i + 1:]
+                                       if r.ready())
+                        break
+            finally:
+                # terminate() kills tours still running, so the budget
+                # is not exceeded by waiting for them
+                pool.terminate()
+                pool.join()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    if len(results) < starts:
+        logger.warning(
+            "MULTISTART time budget %.3fs reached after %d of %d runs",
+            time_budget, len(results), starts,
+        )
+    if score is not None:
+        results = [(score(route), i, route) for _, i, route in results]
+    greedy_score = results[0][0]
+    best_score, run_index, route = min(results, key=lambda r: (r[0], r[1]))
+    if stats is not None:
+        stats.update(greedy_score=greedy_score, best_score=best_score,
+                     best_run=run_index, runs=len(results))
+    logger.info(
+        "MULTISTART best run=%d score=%.6f (greedy score=%.6f, runs=%d, "
+        "top_k=%d, seed=%d, workers=%d)",
+        run_index, best_score, greedy_score, len(results), top_k, seed,
+        max(workers, 1),
+    )
+    return route, best_score
@@ -7,10 +7,18 @@ import csv
 logger = get_logger()
 
 
-def get_orders():
+def get_orders(path=None, rejected_path=None):
+    """
+    Read deliveries from the orders CSV at path (default: ORDERS_FILE).
+
+    Invalid rows are skipped and appended to rejected_path
+    (default: REJECTED_ORDERS).
+    """
+    path = ORDERS_FILE if path is None else path
+    rejected_path = REJECTED_ORDERS if rejected_path is None else rejected_path
     delivery_list = list()
-    logger.info(f"READING {ORDERS_FILE}")
-    with open(ORDERS_FILE, newline='') as csvfile, open(REJECTED_ORDERS, "a") as reject_csv:
+    logger.info(f"READING {path}")
+    with open(path, newline='') as csvfile, open(rejected_path, "a") as reject_csv:
         reader = csv.reader(csvfile)
         next(reader)
         for line_no, row in enumerate(reader, start=2):
@@ -19,10 +27,10 @@ def get_orders():
                 logger.info("ADDED ORDER in line %d: %s", line_no, row)
             except (TypeError, ValueError) as e:
                 writer = csv.writer(reject_csv, delimiter=",")
-                print(f"[WARNING] REJECTED ORDER - Invalid row in {ORDERS_FILE} (line {line_no}): {row} -> {e}")
+                print(f"[WARNING] REJECTED ORDER - Invalid row in {path} (line {line_no}): {row} -> {e}")
                 logger.warning(
                     "REJECTED ORDER Invalid row in %s (line %d): %s -> %s",
-                    ORDERS_FILE, line_no, row, e
+                    path, line_no, row, e
                 )
 
                 writer.writerow([str(e)] + row)
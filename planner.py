@@ -1,86 +1,123 @@
 from CourierOptimizer.orders import get_orders
-from CourierOptimizer.config import OSLO_S_LAT, OSLO_S_LON, ROUTE_FILE, ROUTE_IMG
-from CourierOptimizer.distance import haver_dist
-import numpy as np
+from CourierOptimizer.delivery import Delivery
+from CourierOptimizer.config import (
+    OSLO_S_LAT, OSLO_S_LON, ROUTE_FILE, ROUTE_IMG,
+    MULTISTART_TOP_K, MULTISTART_SEED, DEPART_HOUR,
+)
+from CourierOptimizer.distance import haver_dist_array
 from CourierOptimizer.log import get_logger
 from CourierOptimizer.transport_mode import walk
 import csv
 from CourierOptimizer.decorators import timed
-import matplotlib.pyplot as plt
-from typing import List, Dict
+from CourierOptimizer.report import Telemetry
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Dict, Optional, Sequence
+
+# numpy and matplotlib are imported inside the methods that use them:
+# they dominate start-up time, and short CLI runs should not pay for them
+# before any planning is actually done.
 
 logger = get_logger()
 
+ROUTE_FIELDS = [
+    "from", "to", "distance_km", "cumulative_distance_km",
+    "eta_hours", "cost_leg_nok", "co2_leg_g",
+]
+
 
 class RoutPlanner:
-    def __init__(self, mode, strategy, lat=OSLO_S_LAT, lon=OSLO_S_LON):
+    """
+    Plan a single courier route.
+
+    Orders are read from the orders CSV (get_orders()) unless a sequence of
+    Delivery objects is passed as `orders`. A planner keeps all of its state
+    on the instance, so separate planners can run in separate threads; file
+    output only happens in gen_route()/plot_route() (see plan() for the
+    in-memory result).
+    """
+
+    def __init__(self, mode, strategy, lat=OSLO_S_LAT, lon=OSLO_S_LON,
+                 starts=1, top_k=MULTISTART_TOP_K, seed=MULTISTART_SEED,
+                 time_budget=None, workers=None, depart_hour=DEPART_HOUR,
+                 orders: Optional[Sequence[Delivery]] = None,
+                 cell_size: Optional[int] = None,
+                 telemetry: Optional[Telemetry] = None):
         self.mode = mode
-        self.orders = get_orders()
+        self.orders = list(orders) if orders is not None else get_orders()
         self.strategy = strategy
         self.depot_lat = lat
         self.depot_lon = lon
         self.compute = self.get_compute()
+        # multi-start construction (see multistart.py); starts=1 is plain greedy
+        self.starts = starts
+        self.top_k = top_k
+        self.seed = seed
+        self.time_budget = time_budget
+        self.workers = workers
+        # hierarchical mode (see hierarchical.py): used when there are
+        # more than cell_size orders; None always plans one flat tour
+        if cell_size is not None and cell_size < 1:
+            raise ValueError("cell_size must be at least 1")
+        self.cell_size = cell_size
+        self.route = None
+        self.result = None
+        # stage timings and metrics for the run report (see report.py)
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
+        # clock hour of departure from the depot, used for ETAs
+        self.depart_hour = depart_hour
 
     def get_compute(self):
+        # bound methods (unlike lambdas) can be sent to worker processes
         if self.strategy == "FASTEST":
-            return lambda distance: self.mode.travel_time(distance)
+            return self.mode.travel_time
         elif self.strategy == "CHEAPEST":
-            return lambda distance: self.mode.travel_cost(distance)
+            return self.mode.travel_cost
         elif self.strategy == "LOWEST_CO2":
-            return lambda distance: self.mode.travel_co2(distance)
+            return self.mode.travel_co2
+
+    def coordinates(self):
+        """Return (latitudes, longitudes, priorities) of the orders as arrays."""
+        import numpy as np
+
+        lats = np.array([order.latitude for order in self.orders], dtype=float)
+        lons = np.array([order.longitude for order in self.orders], dtype=float)
+        weights = np.array([order.priority for order in self.orders], dtype=float)
+        return lats, lons, weights
 
     def calculate_distances(self):
         """Build a full pairwise distance matrix between all orders."""
-        n = len(self.orders)
-        dist_matrix = np.zeros((n, n))
+        import numpy as np
 
-        for i in range(n):
-            for j in range(n):
-                if i == j:
-                    dist_matrix[i, j] = np.nan
-
-                else:
-                    point_1 = (self.orders[i].latitude, self.orders[i].longitude)
-                    point_2 = (self.orders[j].latitude, self.orders[j].longitude)
-                    dist_matrix[i, j] = haver_dist(*point_1, *point_2)
+        lats, lons, _ = self.coordinates()
+        n = len(lats)
+        dist_matrix = haver_dist_array(
+            lats[:, None], lons[:, None], lats[None, :], lons[None, :]
+        )
+        np.fill_diagonal(dist_matrix, np.nan)
         logger.info("CALCULATED DISTANCES MATRIX for %d orders (shape %dx%d)", n, n, n)
         return dist_matrix
 
     def get_strategy_matrix(self):
         dist_matrix = self.calculate_distances()
-        n = dist_matrix.shape[0]
-        strategy_matrix = np.zeros((n, n))
-        for i in range(n):
-            for j in range(n):
-                if i == j:
-                    strategy_matrix[i, j] = np.nan
-                else:
-                    value = self.compute(dist_matrix[i, j])
-                    weight = self.orders[j].priority
-                    strategy_matrix[i, j] = value * weight
+        _, _, weights = self.coordinates()
+        # column j is weighted by the priority of the destination stop j
+        strategy_matrix = self.compute(dist_matrix) * weights[None, :]
         logger.info(
             "CALCULATED STRATEGY MATRIX for Transport Mode: %s, Strategy: %s",
             self.mode.mode, self.strategy)
         return strategy_matrix
 
     def from_depot_distances(self):
-        n = len(self.orders)
-        distances = np.zeros(n)
-        for i in range(n):
-            point_1 = (self.depot_lat, self.depot_lon)
-            point_2 = (self.orders[i].latitude, self.orders[i].longitude)
-            distances[i] = haver_dist(*point_1, *point_2)
+        lats, lons, _ = self.coordinates()
+        distances = haver_dist_array(self.depot_lat, self.depot_lon, lats, lons)
         logger.info("Calculated distances from depot.")
         return distances
 
     def from_depot_strategy(self):
         from_depot_dist = self.from_depot_distances()
-        n = len(self.orders)
-        weighted_dist = np.zeros(n)
-        for i in range(n):
-            value = self.compute(from_depot_dist[i])
-            weight = self.orders[i].priority
-            weighted_dist[i] = value * weight
+        _, _, weights = self.coordinates()
+        weighted_dist = self.compute(from_depot_dist) * weights
         logger.info(
             "Calculated weighted depot->stop values "
             "(mode=%s, strategy=%s, orders=%d)",
@@ -90,6 +127,29 @@ class RoutPlanner:
         )
         return weighted_dist
 
+    def eta_objective(self):
+        """
+        Return a function mapping cumulative km to elapsed hours when whole
+        tours must be compared by time-of-day travel time (FASTEST with a
+        speed profile), else None.
+
+        The greedy next-stop choice does not need it: within one hour the
+        profile scales every leg equally. Comparing whole tours (multi-start
+        selection, boundary smoothing) does, since their legs fall in
+        different hours.
+        """
+        if self.strategy != "FASTEST" or self.mode.profile is None:
+            return None
+        return partial(self.mode.eta_hours, depart_hour=self.depart_hour)
+
+    def route_objective(self, route) -> float:
+        """Priority-weighted objective value of route, ETA-aware if needed."""
+        from CourierOptimizer.hierarchical import route_score
+
+        lats, lons, weights = self.coordinates()
+        return route_score(route, lats, lons, weights, self.compute,
+                           self.depot_lat, self.depot_lon, self.eta_objective())
+
     @timed
     def optimize(self) -> List[int]:
         """
@@ -103,154 +163,266 @@ class RoutPlanner:
            the minimum value in the strategy matrix row of the current stop.
         3. Returns the route as a list of order indices in visiting order.
 
+        With starts > 1, several randomized greedy tours are built instead
+        (different first stops, random choice among the top_k cheapest next
+        stops) and the one with the lowest objective value is kept.
+
+        With cell_size set and more orders than that, the stops are routed
+        cell by cell instead (see hierarchical.py); no n x n matrix is built.
+
         Returns:
             list[int]: Indices of orders in the optimized visiting order.
         """
+        import numpy as np
+        from CourierOptimizer.multistart import greedy_tour, multistart
+
         n = len(self.orders)
-        unvisited = set(range(n))
+        self.telemetry.info.update(
+            starts=self.starts, top_k=self.top_k, seed=self.seed,
+            time_budget=self.time_budget, cell_size=self.cell_size,
+            depart_hour=self.depart_hour,
+        )
+        if n == 0:
+            self.route = []
+            return self.route
         logger.info(
-            "Starting route optimization (orders=%d, mode=%s, strategy=%s)",
+            "Starting route optimization (orders=%d, mode=%s, strategy=%s, starts=%d)",
             n,
             self.mode.mode,
             self.strategy,
+            self.starts,
         )
-        from_depot = self.from_depot_strategy()
-        current = int(np.nanargmin(from_depot))
-        unvisited.remove(current)
-        route = [current, ]
-        strategy_matrix = self.get_strategy_matrix()
-        logger.debug("Initial stop from depot chosen: index=%d, name=%s",
-                     current, self.orders[current].name)
-
-        while unvisited:
-            row = strategy_matrix[current].copy()
-            for i in range(n):
-                if i not in unvisited:
-                    row[i] = np.nan
-            next_idx = int(np.nanargmin(row))
-            row[next_idx] = np.nan
-            unvisited.remove(next_idx)
-            route.append(next_idx)
-            current = next_idx
-
+        eta = self.eta_objective()
+        if self.cell_size is not None and n > self.cell_size:
+            from CourierOptimizer.hierarchical import hierarchical_route
+
+            if self.starts > 1:
+                logger.warning("Multi-start is ignored in hierarchical mode")
+            lats, lons, weights = self.coordinates()
+            stats = {}
+            with self.telemetry.stage("hierarchical"):
+                self.route = hierarchical_route(
+                    lats, lons, weights, self.compute, self.depot_lat,
+                    self.depot_lon, self.cell_size, workers=self.workers,
+                    stats=stats, eta=eta,
+                )
+            self.telemetry.info.update(cells=stats["cells"],
+                                       largest_cell=stats["largest_cell"])
+            self.telemetry.improvement("boundary smoothing",
+                                       stats["stitched_score"],
+                                       stats["smoothed_score"])
+            return self.route
+
+        with self.telemetry.stage("depot_values"):
+            from_depot = self.from_depot_strategy()
+        with self.telemetry.stage("strategy_matrix"):
+            strategy_matrix = self.get_strategy_matrix()
+        self.telemetry.matrix("strategy_matrix", strategy_matrix)
+
+        if self.starts > 1:
+            stats = {}
+            with self.telemetry.stage("multistart"):
+                route, _ = multistart(
+                    strategy_matrix, from_depot, self.starts, top_k=self.top_k,
+                    seed=self.seed, time_budget=self.time_budget,
+                    workers=self.workers, stats=stats,
+                    score=self.route_objective if eta is not None else None,
+                )
+            self.telemetry.info.update(runs_completed=stats["runs"])
+            self.telemetry.improvement("multistart", stats["greedy_score"],
+                                       stats["best_score"])
+        else:
+            current = int(np.nanargmin(from_depot))
+            logger.debug("Initial stop from depot chosen: index=%d, name=%s",
+                         current, self.orders[current].name)
+            with self.telemetry.stage("greedy"):
+                route = greedy_tour(strategy_matrix, current)
+
+        self.route = route
         return route
 
-    def gen_route(self) -> List[Dict]:
+    def plan(self) -> "RouteResult":
         """
-        Generate the detailed route for the current transport mode and strategy.
+        Build the route in memory, without touching any file.
 
         The method:
           1. Calls optimize() to obtain the visiting order of stops.
           2. Computes per-leg distance, time, cost and CO2 from the depot
              to the first stop and between consecutive stops.
-          3. Accumulates total distance and time for ETA.
-          4. Writes the route to ROUTE_FILE as CSV.
+          3. Accumulates total distance and computes ETAs from the departure
+             hour, following the transport mode's speed profile if any.
 
         Returns:
-            list[dict]: List of rows describing each leg of the route.
-                        Each row contains: from, to, distance_km,
-                        cumulative_distance_km, eta_hours, cost_leg_nok, co2_leg_g.
+            RouteResult: visiting order plus one row per leg. Each row
+                         contains: from, to, distance_km,
+                         cumulative_distance_km, eta_hours, cost_leg_nok, co2_leg_g.
         """
         logger.info(
-            "Generating route CSV (mode=%s, strategy=%s)",
+            "Generating route (mode=%s, strategy=%s)",
             self.mode.mode,
             self.strategy,
         )
-        # route as list of order indices in visiting order
-        idx_list = self.optimize()
+        with self.telemetry.stage("plan"):
+            return self._plan()
 
-        # pure distances in km
-        depot_distances = self.from_depot_distances()  # length n
-        dist_matrix = self.calculate_distances()  # n x n
+    def _plan(self) -> "RouteResult":
+        import numpy as np
 
-        rows = []
-        cumulative_distance = 0.0
-        cumulative_time = 0.0
-        total_cost: float = 0.0
-        total_co2: float = 0.0
+        # route as list of order indices in visiting order
+        if self.route is None:
+            with self.telemetry.stage("optimize"):
+                self.optimize()
+        idx_list = self.route
+
+        route = np.asarray(idx_list, dtype=int)
+        lats, lons, _ = self.coordinates()
+        # leg start points: the depot, then every stop but the last
+        from_lats = np.concatenate(([self.depot_lat], lats[route]))[:-1]
+        from_lons = np.concatenate(([self.depot_lon], lons[route]))[:-1]
+        distances = haver_dist_array(from_lats, from_lons, lats[route], lons[route])
+
+        cumulative = np.cumsum(distances)
+        # legs are driven back to back from depart_hour, so each leg is
+        # timed at the speed of the hours it is actually driven in
+        eta = self.mode.eta_hours(cumulative, self.depart_hour)
+        leg_costs = self.mode.travel_cost(distances)
+        leg_co2 = self.mode.travel_co2(distances)
+
+        cumulative_distance = float(cumulative[-1]) if len(route) else 0.0
+        cumulative_time = float(eta[-1]) if len(route) else 0.0
+        total_cost = float(leg_costs.sum())
+        total_co2 = float(leg_co2.sum())
 
+        rows = []
         for pos, curr_idx in enumerate(idx_list):
-            # determine distance from previous point
             if pos == 0:
                 # first leg: from depot (Oslo S) to first stop
-                distance = depot_distances[curr_idx]
                 from_label = "OSLO S"
             else:
-                prev_idx = idx_list[pos - 1]
-                distance = dist_matrix[prev_idx, curr_idx]
-                from_label = self.orders[prev_idx].name
-
-            # compute leg metrics for the current transport mode
-            leg_time = self.mode.travel_time(distance)
-            leg_cost = self.mode.travel_cost(distance)
-            leg_co2 = self.mode.travel_co2(distance)
-
-            cumulative_distance += distance
-            cumulative_time += leg_time
-            total_cost += leg_cost
-            total_co2 += leg_co2
-
+                from_label = self.orders[idx_list[pos - 1]].name
             rows.append({
                 "from": from_label,
                 "to": self.orders[curr_idx].name,
-                "distance_km": distance,
-                "cumulative_distance_km": cumulative_distance,
-                "eta_hours": cumulative_time,
-                "cost_leg_nok": leg_cost,
-                "co2_leg_g": leg_co2,
+                "distance_km": float(distances[pos]),
+                "cumulative_distance_km": float(cumulative[pos]),
+                "eta_hours": float(eta[pos]),
+                "cost_leg_nok": float(leg_costs[pos]),
+                "co2_leg_g": float(leg_co2[pos]),
             })
-        with open(ROUTE_FILE, "w") as f:
-            fieldnames = rows[0].keys()
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
 
         logger.info(
-            "Route CSV written to %s "
+            "Route generated "
             "(stops=%d, total_distance=%.3f km, total_time=%.3f h, "
             "total_cost=%.2f NOK, total_co2=%.1f g)",
-            ROUTE_FILE,
             len(rows),
             cumulative_distance,
             cumulative_time,
             total_cost,
             total_co2,
         )
+        self.result = RouteResult(
+            mode=self.mode.mode,
+            strategy=self.strategy,
+            depot_lat=self.depot_lat,
+            depot_lon=self.depot_lon,
+            orders=list(self.orders),
+            route=list(idx_list),
+            rows=rows,
+            telemetry=self.telemetry,
+        )
+        return self.result
+
+    def gen_route(self, route_file=ROUTE_FILE) -> List[Dict]:
+        """
+        Generate the detailed route (see plan()) and write it as CSV to
+        route_file, unless route_file is None.
+
+        Returns:
+            list[dict]: List of rows describing each leg of the route.
+        """
+        result = self.plan() if self.result is None else self.result
+        if route_file is not None and result.rows:
+            result.write_csv(route_file)
+        return result.rows
+
+    def plot_route(self, route_img=ROUTE_IMG):
+        """Save a plot of the route to route_img."""
+        result = self.plan() if self.result is None else self.result
+        result.write_plot(route_img)
+
+
+@dataclass
+class RouteResult:
+    """A planned route: visiting order and per-leg rows, held in memory."""
+    mode: str
+    strategy: str
+    depot_lat: float
+    depot_lon: float
+    orders: List[Delivery]
+    route: List[int]
+    rows: List[Dict] = field(default_factory=list)
+    telemetry: Optional[Telemetry] = None
+
+    @property
+    def total_distance_km(self) -> float:
+        return self.rows[-1]["cumulative_distance_km"] if self.rows else 0.0
+
+    @property
+    def total_time_h(self) -> float:
+        return self.rows[-1]["eta_hours"] if self.rows else 0.0
+
+    @property
+    def total_cost_nok(self) -> float:
+        return sum(row["cost_leg_nok"] for row in self.rows)
+
+    @property
+    def total_co2_g(self) -> float:
+        return sum(row["co2_leg_g"] for row in self.rows)
+
+    def write_csv(self, path) -> None:
+        """Write the per-leg rows to path as CSV."""
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=ROUTE_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows)
+        logger.info("Route CSV written to %s (stops=%d)", path, len(self.rows))
 
-        return rows
+    def write_plot(self, path) -> None:
+        """Save a plot of the route to path (PNG, or any matplotlib format)."""
+        # The object-oriented API keeps no global figure state (unlike
+        # pyplot), so plots can be drawn from several threads at once.
+        from matplotlib.figure import Figure
 
-    def plot_route(self):
         logger.info("START generating Route plot")
-        idx_list = self.optimize()
         xs = [self.depot_lon]
         ys = [self.depot_lat]
-        for idx in idx_list:
+        for idx in self.route:
             order = self.orders[idx]
             xs.append(order.longitude)
             ys.append(order.latitude)
 
-        plt.figure(figsize=(6, 6))
+        fig = Figure(figsize=(6, 6))
+        ax = fig.subplots()
         # line between points
-        plt.plot(xs, ys, marker="o")
+        ax.plot(xs, ys, marker="o")
 
         # mark depot
-        plt.scatter(self.depot_lon, self.depot_lat, s=80)
-        plt.text(self.depot_lon, self.depot_lat, " depot", fontsize=12)
+        ax.scatter(self.depot_lon, self.depot_lat, s=80)
+        ax.text(self.depot_lon, self.depot_lat, " depot", fontsize=12)
 
         # mark stops in order (1, 2, 3, ...)
-        for step, idx in enumerate(idx_list, start=1):
+        for step, idx in enumerate(self.route, start=1):
             order = self.orders[idx]
-            plt.text(order.longitude, order.latitude, f" {step}", fontsize=12)
+            ax.text(order.longitude, order.latitude, f" {step}", fontsize=12)
 
-        plt.xlabel("Longitude")
-        plt.ylabel("Latitude")
-        plt.title(f"Route for mode={self.mode.mode}, strategy={self.strategy}")
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(ROUTE_IMG)
-        plt.close()
+        ax.set_xlabel("Longitude")
+        ax.set_ylabel("Latitude")
+        ax.set_title(f"Route for mode={self.mode}, strategy={self.strategy}")
+        ax.grid(True)
+        fig.tight_layout()
+        fig.savefig(path)
 
-        logger.info("Route plot saved to %s", ROUTE_IMG)
+        logger.info("Route plot saved to %s", path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,325 @@
+# report.py
+"""
+Run telemetry and the route-quality report.
+
+A Telemetry object travels with one planner run and collects stage
+timings, matrix sizes, per-stage objective improvements and planner
+options. write_report() turns it into:
+
+  - report.json: the record of this run,
+  - report.html: a self-contained page (no external assets) with this
+    run and a history of earlier runs,
+  - report_history.jsonl: an append-only store with one record per run.
+
+A run is flagged as a regression when its planning time is more than
+REGRESSION_FACTOR times the median of earlier runs with the same mode,
+strategy, planner options (COMPARABLE_OPTIONS) and a similar number of
+stops. Only the last HISTORY_LIMIT runs of the store are read.
+"""
+import datetime
+import html
+import json
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from CourierOptimizer.log import get_logger
+
+try:
+    import resource
+except ImportError:  # Windows: no peak memory figure
+    resource = None
+
+logger = get_logger()
+
+REGRESSION_FACTOR = 1.5
+# planner options that change the planning time, so runs are only
+# comparable when they match
+COMPARABLE_OPTIONS = ("starts", "top_k", "cell_size", "time_budget")
+# earlier runs compared against, and runs shown in the HTML history
+HISTORY_WINDOW = 20
+HISTORY_SHOWN = 50
+# runs read from the end of the history store
+HISTORY_LIMIT = 500
+
+
+class Telemetry:
+    """Collects timings and metrics of one planner run."""
+
+    def __init__(self):
+        self.stages = {}
+        self.matrices = {}
+        self.improvements = []
+        self.info = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block; repeated stages are added up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            logger.info("STAGE %s duration = %.6f seconds", name, elapsed)
+
+    def matrix(self, name: str, array) -> None:
+        """Record the shape and size of a numpy array."""
+        self.matrices[name] = {
+            "shape": list(array.shape),
+            "bytes": int(array.nbytes),
+        }
+
+    def improvement(self, stage: str, before: float, after: float) -> None:
+        """Record the objective value before and after an optimization stage."""
+        self.improvements.append({
+            "stage": stage,
+            "before": float(before),
+            "after": float(after),
+            "gain_pct": 100.0 * (before - after) / before if before else 0.0,
+        })
+
+    def as_dict(self) -> dict:
+        return {
+            "stages": dict(self.stages),
+            "matrices": dict(self.matrices),
+            "improvements": list(self.improvements),
+            "info": dict(self.info),
+        }
+
+
+def _process_peak_rss_mb():
+    """
+    Peak resident memory of the whole process so far, not of one run: in
+    worker mode it keeps the peak of the largest job served.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def build_record(result, telemetry: Telemetry) -> dict:
+    """Return the JSON-serialisable record of one run."""
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "mode": result.mode,
+        "strategy": result.strategy,
+        "stops": len(result.route),
+        "metrics": {
+            "total_distance_km": result.total_distance_km,
+            "total_time_h": result.total_time_h,
+            "total_cost_nok": result.total_cost_nok,
+            "total_co2_g": result.total_co2_g,
+        },
+        "process_peak_rss_mb": _process_peak_rss_mb(),
+        **telemetry.as_dict(),
+    }
+
+
+def _tail_lines(path: Path, count: int, block_size: int = 1 << 16) -> list:
+    """Return the last count lines of a file, reading it from the end."""
+    with open(path, "rb") as f:
+        end = f.seek(0, 2)
+        data = b""
+        while end > 0 and data.count(b"\n") <= count:
+            start = max(end - block_size, 0)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    return data.decode("utf-8", errors="replace").splitlines()[-count:]
+
+
+def load_history(path, limit: int = HISTORY_LIMIT) -> list:
+    """
+    Read the last `limit` records from the history store (skipping broken
+    lines). Only the end of the file is read, so the cost does not grow
+    with the size of the store.
+    """
+    path = Path(path)
+    if not path.exists():
+        return []
+    records = []
+    for line in _tail_lines(path, limit):
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            logger.warning("Skipping unreadable history line in %s", path)
+    return records
+
+
+def append_history(record: dict, path) -> None:
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def _plan_seconds(record: dict) -> float:
+    return record.get("stages", {}).get("plan", 0.0)
+
+
+def _options_key(record: dict) -> tuple:
+    info = record.get("info", {})
+    return tuple(info.get(name) for name in COMPARABLE_OPTIONS)
+
+
+def check_regression(record: dict, history: list) -> dict:
+    """
+    Compare the planning time of record with comparable earlier runs:
+    same mode, strategy and COMPARABLE_OPTIONS, between half and twice as
+    many stops.
+    """
+    options = _options_key(record)
+    similar = [
+        _plan_seconds(r) for r in history
+        if r.get("mode") == record["mode"]
+        and r.get("strategy") == record["strategy"]
+        and _options_key(r) == options
+        and record["stops"] / 2 <= r.get("stops", 0) <= record["stops"] * 2
+    ][-HISTORY_WINDOW:]
+    if not similar:
+        return {"baseline_s": None, "ratio": None, "regression": False}
+    baseline = statistics.median(similar)
+    ratio = _plan_seconds(record) / baseline if baseline else None
+    return {
+        "baseline_s": baseline,
+        "ratio": ratio,
+        "regression": ratio is not None and ratio > REGRESSION_FACTOR,
+    }
+
+
+def _table(headers, rows) -> str:
+    head = "".join(f"<th>{html.escape(str(h))}</th>" for h in headers)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(c))}</td>" for c in row) + "</tr>"
+        for row in rows
+    )
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+
+def _sparkline(values, width=480, height=60) -> str:
+    """Inline SVG line chart of values (oldest first)."""
+    if len(values) < 2:
+        return ""
+    low, high = min(values), max(values)
+    span = (high - low) or 1.0
+    step = width / (len(values) - 1)
+    points = " ".join(
+        f"{i * step:.1f},{height - (v - low) / span * (height - 4) - 2:.1f}"
+        for i, v in enumerate(values)
+    )
+    return (
+        f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f'<polyline fill="none" stroke="#2b6cb0" stroke-width="2" points="{points}"/>'
+        f"</svg>"
+    )
+
+
+def render_html(record: dict, history: list) -> str:
+    """Render the report page for record, with history (oldest first)."""
+    metrics = record["metrics"]
+    regression = record.get("regression", {})
+    status = "REGRESSION" if regression.get("regression") else "ok"
+    ratio = regression.get("ratio")
+
+    summary = _table(["", ""], [
+        ["Run", record["timestamp"]],
+        ["Mode / strategy", f"{record['mode']} / {record['strategy']}"],
+        ["Stops", record["stops"]],
+        ["Total distance", f"{metrics['total_distance_km']:.2f} km"],
+        ["Total time", f"{metrics['total_time_h']:.2f} h"],
+        ["Total cost", f"{metrics['total_cost_nok']:.2f} NOK"],
+        ["Total CO2", f"{metrics['total_co2_g']:.1f} g"],
+        ["Peak memory (process lifetime)",
+         f"{record['process_peak_rss_mb']:.1f} MB"
+         if record["process_peak_rss_mb"] is not None else "n/a"],
+        ["Planning time vs history",
+         f"{ratio:.2f}x median ({status})" if ratio is not None else "no history"],
+    ])
+    options = _table(["Option", "Value"], sorted(record["info"].items()))
+    stages = _table(
+        ["Stage", "Seconds"],
+        [[name, f"{sec:.6f}"] for name, sec in record["stages"].items()],
+    )
+    matrices = _table(
+        ["Matrix", "Shape", "MB"],
+        [[name, " x ".join(map(str, m["shape"])), f"{m['bytes'] / 2 ** 20:.2f}"]
+         for name, m in record["matrices"].items()],
+    )
+    improvements = _table(
+        ["Stage", "Objective before", "Objective after", "Gain %"],
+        [[i["stage"], f"{i['before']:.6g}", f"{i['after']:.6g}", f"{i['gain_pct']:.2f}"]
+         for i in record["improvements"]],
+    )
+
+    shown = history[-HISTORY_SHOWN:]
+    trends = []
+    for mode, strategy in sorted({(r.get("mode"), r.get("strategy")) for r in shown}):
+        runs = [r for r in shown if (r.get("mode"), r.get("strategy")) == (mode, strategy)]
+        trends.append(
+            f"<h3>{html.escape(f'{mode} / {strategy}')} ({len(runs)} runs)</h3>"
+            f"<p>Planning time (s)</p>{_sparkline([_plan_seconds(r) for r in runs])}"
+            f"<p>Total time (h)</p>"
+            f"{_sparkline([r['metrics']['total_time_h'] for r in runs])}"
+        )
+    history_table = _table(
+        ["Run", "Mode", "Strategy", "Stops", "Plan s", "km", "h", "Regression"],
+        [[r.get("timestamp"), r.get("mode"), r.get("strategy"), r.get("stops"),
+          f"{_plan_seconds(r):.4f}", f"{r['metrics']['total_distance_km']:.2f}",
+          f"{r['metrics']['total_time_h']:.2f}",
+          "yes" if r.get("regression", {}).get("regression") else ""]
+         for r in reversed(shown)],
+    )
+
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8">
+<title>CourierOptimizer run report</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; color: #222; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5em; }}
+td, th {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; }}
+th {{ background: #f0f0f0; }}
+.status-REGRESSION {{ color: #c53030; font-weight: bold; }}
+</style></head><body>
+<h1>CourierOptimizer run report</h1>
+<p class="status-{status}">Status: {status}</p>
+<h2>This run</h2>{summary}
+<h2>Options</h2>{options}
+<h2>Stage timings</h2>{stages}
+<h2>Matrices</h2>{matrices}
+<h2>Optimization stages</h2>{improvements}
+<h2>History</h2>{''.join(trends)}{history_table}
+</body></html>
+"""
+
+
+def write_report(result, out_dir, history_path=None):
+    """
+    Write report.json and report.html for result into out_dir and append
+    the run to history_path (default: out_dir / "report_history.jsonl").
+
+    Returns the paths of the JSON and HTML reports.
+    """
+    out_dir = Path(out_dir)
+    history_path = Path(history_path) if history_path else out_dir / "report_history.jsonl"
+    record = build_record(result, result.telemetry or Telemetry())
+    history = load_history(history_path)
+    record["regression"] = check_regression(record, history)
+    append_history(record, history_path)
+
+    json_path = out_dir / "report.json"
+    html_path = out_dir / "report.html"
+    with open(json_path, "w") as f:
+        json.dump(record, f, indent=2)
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(render_html(record, history + [record]))
+
+    if record["regression"]["regression"]:
+        logger.warning(
+            "PERFORMANCE REGRESSION planning took %.2fx the median of earlier runs",
+            record["regression"]["ratio"],
+        )
+    logger.info("Run report written to %s and %s", json_path, html_path)
+    return json_path, html_path
@@ -107,3 +107,403 @@ def test_orders_invalid_row_does_not_crash(tmp_path, monkeypatch):
     assert len(deliveries) == 1
     assert isinstance(deliveries[0], Delivery)
 
+
+
+# ---------- start-up and worker tests ----------
+
+
+def test_cli_import_is_lazy():
+    """Importing the CLI must not import numpy or matplotlib."""
+    from CourierOptimizer.benchmarks.import_time import measure
+
+    result = measure(runs=1)
+    assert result["eager_modules"] == []
+
+
+def test_worker_round_trip(tmp_path, monkeypatch):
+    """A job sent with submit() reaches run_job() and its summary comes back."""
+    import socketserver
+    import threading
+
+    from CourierOptimizer import worker
+
+    monkeypatch.setattr(worker, "run_job", lambda job: {"stops": job["mode"]})
+    socket_path = str(tmp_path / "worker.sock")
+    server = socketserver.UnixStreamServer(socket_path, worker._JobHandler)
+    thread = threading.Thread(target=server.handle_request)
+    thread.start()
+    try:
+        response = worker.submit(socket_path, {"mode": "bike"}, timeout=5)
+    finally:
+        thread.join()
+        server.server_close()
+
+    assert response == {"ok": True, "summary": {"stops": "bike"}}
+
+
+def test_worker_refuses_socket_in_use(tmp_path):
+    """serve() does not take over the socket of a running worker."""
+    import socketserver
+
+    from CourierOptimizer import worker
+
+    socket_path = str(tmp_path / "worker.sock")
+    server = socketserver.UnixStreamServer(socket_path, worker._JobHandler)
+    try:
+        with pytest.raises(RuntimeError):
+            worker.serve(socket_path)
+    finally:
+        server.server_close()
+
+
+def test_submit_without_worker_fails_with_exit_status(tmp_path, capsys):
+    """--submit with no worker listening prints one line and returns 1."""
+    from CourierOptimizer.cli import main
+
+    status = main(["--submit", str(tmp_path / "missing.sock")])
+
+    assert status == 1
+    assert capsys.readouterr().out.startswith("Cannot reach worker")
+
+
+# ---------- multi-start tests ----------
+
+
+def _random_problem(n, seed=1):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    matrix = rng.uniform(1.0, 10.0, size=(n, n))
+    np.fill_diagonal(matrix, np.nan)
+    return matrix, rng.uniform(1.0, 10.0, size=n)
+
+
+def test_greedy_tour_visits_every_stop_once():
+    """The plain greedy tour is a permutation of all order indices."""
+    from CourierOptimizer.multistart import greedy_tour
+
+    matrix, from_depot = _random_problem(12)
+    route = greedy_tour(matrix, first=3)
+    assert route[0] == 3
+    assert sorted(route) == list(range(12))
+
+
+def test_multistart_is_reproducible_and_not_worse_than_greedy():
+    """Same seed gives the same tour regardless of the number of workers."""
+    from CourierOptimizer.multistart import greedy_tour, multistart, tour_score
+
+    matrix, from_depot = _random_problem(30)
+    greedy = greedy_tour(matrix, int(from_depot.argmin()))
+
+    serial = multistart(matrix, from_depot, starts=8, seed=7, workers=1)
+    parallel = multistart(matrix, from_depot, starts=8, seed=7, workers=2)
+
+    assert serial == parallel
+    assert serial[1] <= tour_score(greedy, matrix, from_depot)
+
+
+def test_multistart_time_budget_drops_unfinished_runs():
+    """An exhausted budget returns the finished tours instead of waiting."""
+    from CourierOptimizer.multistart import multistart
+
+    matrix, from_depot = _random_problem(200)
+    stats = {}
+    route, _ = multistart(matrix, from_depot, starts=50, workers=2,
+                          time_budget=0.0, stats=stats)
+    assert sorted(route) == list(range(200))
+    assert 1 <= stats["runs"] < 50
+
+
+# ---------- speed profile tests ----------
+
+
+def test_eta_without_profile_is_distance_over_speed():
+    """Without a profile, ETAs are the plain distance / speed values."""
+    from CourierOptimizer.transport_mode import car
+
+    eta = car.eta_hours([10.0, 50.0, 75.0], depart_hour=8.0)
+    assert list(eta) == pytest.approx([0.2, 1.0, 1.5])
+
+
+def test_eta_follows_speed_profile_across_hours():
+    """Speed changes at the full hour, also in the middle of a leg."""
+    from dataclasses import replace
+    from CourierOptimizer.transport_mode import car
+
+    profile = [1.0] * 24
+    profile[8] = 0.5                      # 25 km/h between 08:00 and 09:00
+    slow_car = replace(car, profile=tuple(profile))
+
+    # leaving 08:30: 12.5 km in the first half hour, then 50 km/h again
+    eta = slow_car.eta_hours([12.5, 37.5], depart_hour=8.5)
+    assert list(eta) == pytest.approx([0.5, 1.0])
+
+
+def test_fastest_with_profile_scores_tours_by_time_of_day():
+    """Whole tours are compared with profile ETAs, not constant speed."""
+    from dataclasses import replace
+    from CourierOptimizer.api import deliveries_from_arrays
+    from CourierOptimizer.planner import RoutPlanner
+    from CourierOptimizer.transport_mode import car
+
+    orders = deliveries_from_arrays([59.9139, 59.9231, 59.9325],
+                                    [10.7522, 10.7599, 10.7174])
+    flat = RoutPlanner(car, "FASTEST", orders=orders)
+    slow = RoutPlanner(replace(car, profile=(0.5,) * 24), "FASTEST",
+                       orders=orders)
+
+    assert flat.eta_objective() is None
+    assert slow.route_objective([0, 1, 2]) == pytest.approx(
+        2 * flat.route_objective([0, 1, 2]))
+
+
+def test_multistart_ranks_tours_with_custom_score():
+    """A score function replaces the matrix score for picking the best tour."""
+    from CourierOptimizer.multistart import multistart
+
+    matrix, from_depot = _random_problem(12)
+    route, best = multistart(matrix, from_depot, starts=12, workers=1,
+                             score=lambda r: r[0])
+    assert route[0] == 0 and best == 0
+
+
+def test_load_speed_profiles(tmp_path):
+    """Missing hours default to 1.0, invalid multipliers are rejected."""
+    from CourierOptimizer.transport_mode import load_speed_profiles
+
+    path = tmp_path / "profiles.csv"
+    path.write_text("mode,hour,multiplier\ncar,8,0.6\n")
+    profiles = load_speed_profiles(path)
+    assert profiles["car"][8] == pytest.approx(0.6)
+    assert profiles["car"][12] == pytest.approx(1.0)
+
+    path.write_text("mode,hour,multiplier\ncar,8,0\n")
+    with pytest.raises(ValueError):
+        load_speed_profiles(path)
+
+
+# ---------- in-process API tests ----------
+
+
+def test_plan_route_from_arrays_writes_nothing(tmp_path, monkeypatch):
+    """plan_route() works purely in memory unless an output path is given."""
+    from CourierOptimizer.api import plan_route
+
+    monkeypatch.chdir(tmp_path)
+    result = plan_route(
+        latitudes=[59.9139, 59.9231, 59.9325],
+        longitudes=[10.7522, 10.7599, 10.7174],
+        priorities=["High", "Medium", "Low"],
+        mode="bike",
+    )
+    assert sorted(result.route) == [0, 1, 2]
+    assert len(result.rows) == 3
+    assert result.total_distance_km > 0
+    assert list(tmp_path.iterdir()) == []
+
+    result.write_csv(tmp_path / "route.csv")
+    with open(tmp_path / "route.csv", newline="") as f:
+        assert len(list(csv.DictReader(f))) == 3
+
+
+def test_plan_route_leaves_logging_unconfigured():
+    """The library configures no root handler and writes no run.log."""
+    import os
+    import subprocess
+    import sys
+
+    code = (
+        "import logging; from CourierOptimizer.api import plan_route; "
+        "plan_route(latitudes=[59.91, 59.93], longitudes=[10.75, 10.72]); "
+        "print(logging.getLogger().handlers)"
+    )
+    size = cfg.RUN_LOG_FILE.stat().st_size if cfg.RUN_LOG_FILE.exists() else 0
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    out = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                         capture_output=True, text=True).stdout
+
+    assert out.strip() == "[]"
+    assert (cfg.RUN_LOG_FILE.stat().st_size if cfg.RUN_LOG_FILE.exists() else 0) == size
+
+
+def test_plan_route_passes_weights_and_reads_profiles_once(monkeypatch):
+    """Array weights reach the deliveries; mode lookup does not re-read files."""
+    from CourierOptimizer import transport_mode
+    from CourierOptimizer.api import plan_route
+
+    transport_mode.get_mode("walk")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("speed profiles read again")
+
+    monkeypatch.setattr(transport_mode, "load_speed_profiles", fail)
+    result = plan_route(latitudes=[59.91, 59.92], longitudes=[10.75, 10.76],
+                        weights=[2.5, 4.0], mode="walk")
+    assert [order.weight_kg for order in result.orders] == [2.5, 4.0]
+
+
+def test_plan_route_in_threads_matches_sequential():
+    """Concurrent planners do not share state."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+    from CourierOptimizer.api import plan_route
+
+    rng = np.random.default_rng(3)
+    problems = [
+        (59.85 + rng.random(40) * 0.1, 10.65 + rng.random(40) * 0.2)
+        for _ in range(6)
+    ]
+
+    def run(problem):
+        return plan_route(latitudes=problem[0], longitudes=problem[1]).route
+
+    sequential = [run(p) for p in problems]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        threaded = list(pool.map(run, problems))
+    assert threaded == sequential
+
+
+def test_multistart_pool_from_threads_matches_sequential():
+    """Multi-start process pools started from several threads do not hang."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+    from CourierOptimizer.api import plan_route
+
+    rng = np.random.default_rng(4)
+    problems = [
+        (59.85 + rng.random(60) * 0.1, 10.65 + rng.random(60) * 0.2)
+        for _ in range(4)
+    ]
+
+    def run(problem):
+        return plan_route(latitudes=problem[0], longitudes=problem[1],
+                          starts=6, workers=2).route
+
+    sequential = [run(p) for p in problems]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(run, p) for p in problems]
+        threaded = [f.result(timeout=60) for f in futures]
+    assert threaded == sequential
+
+
+# ---------- hierarchical mode tests ----------
+
+
+def test_split_cells_bounds_cell_size():
+    """Every stop lands in exactly one cell of at most cell_size stops."""
+    import numpy as np
+    from CourierOptimizer.hierarchical import split_cells
+
+    rng = np.random.default_rng(5)
+    lats = 59.8 + rng.random(1000) * 0.2
+    lons = 10.6 + rng.random(1000) * 0.4
+    cells = split_cells(lats, lons, cell_size=64)
+
+    assert max(len(c) for c in cells) <= 64
+    assert sorted(np.concatenate(cells).tolist()) == list(range(1000))
+
+
+def test_invalid_cell_size_raises_value_error():
+    """cell_size below 1 is rejected instead of splitting forever."""
+    import numpy as np
+    from CourierOptimizer.api import plan_route
+    from CourierOptimizer.hierarchical import split_cells
+
+    with pytest.raises(ValueError):
+        plan_route(latitudes=[59.91, 59.92], longitudes=[10.75, 10.76],
+                   cell_size=0)
+    with pytest.raises(ValueError):
+        split_cells(np.array([59.91, 59.92]), np.array([10.75, 10.76]), 0)
+
+
+def test_cli_rejects_non_positive_cell_size_and_starts(capsys):
+    """--hierarchical 0 and --starts -1 are reported, not changed to 1."""
+    from CourierOptimizer.cli import parse_args
+
+    for argv in (["--hierarchical", "0"], ["--starts", "-1"]):
+        with pytest.raises(SystemExit) as exc:
+            parse_args(argv)
+        assert exc.value.code == 2
+        assert "must be at least 1" in capsys.readouterr().err
+
+
+def test_hierarchical_route_visits_every_stop_once():
+    """Hierarchical planning returns a permutation of all orders."""
+    import numpy as np
+    from CourierOptimizer.api import plan_route
+
+    rng = np.random.default_rng(6)
+    lats = 59.8 + rng.random(600) * 0.2
+    lons = 10.6 + rng.random(600) * 0.4
+    result = plan_route(latitudes=lats, longitudes=lons, cell_size=50, workers=1)
+
+    assert sorted(result.route) == list(range(600))
+    assert len(result.rows) == 600
+
+
+# ---------- run report tests ----------
+
+
+def test_run_report_json_html_and_history(tmp_path):
+    """Each report adds a history record; the HTML is self-contained."""
+    import json
+    from CourierOptimizer.api import plan_route
+
+    coords = dict(latitudes=[59.9139, 59.9231, 59.9325, 59.9120],
+                  longitudes=[10.7522, 10.7599, 10.7174, 10.7790])
+    plan_route(report_dir=tmp_path, **coords)
+    plan_route(report_dir=tmp_path, starts=3, **coords)
+
+    record = json.loads((tmp_path / "report.json").read_text())
+    assert record["stops"] == 4
+    assert "plan" in record["stages"]
+    assert record["matrices"]["strategy_matrix"]["shape"] == [4, 4]
+    assert record["improvements"][0]["stage"] == "multistart"
+
+    history = (tmp_path / "report_history.jsonl").read_text().splitlines()
+    assert len(history) == 2
+
+    page = (tmp_path / "report.html").read_text()
+    assert "<svg" in page
+    assert "src=" not in page and "href=" not in page
+
+
+def test_check_regression_flags_slow_run():
+    """A run much slower than similar earlier runs is flagged."""
+    from CourierOptimizer.report import check_regression
+
+    history = [{"mode": "Car", "strategy": "FASTEST", "stops": 100,
+                "stages": {"plan": 0.1}} for _ in range(5)]
+    record = {"mode": "Car", "strategy": "FASTEST", "stops": 120,
+              "stages": {"plan": 0.5}}
+    assert check_regression(record, history)["regression"]
+    record["stages"]["plan"] = 0.11
+    assert not check_regression(record, history)["regression"]
+
+
+
+def test_check_regression_ignores_runs_with_other_options():
+    """A multi-start run is not compared with single-start runs."""
+    from CourierOptimizer.report import check_regression
+
+    history = [{"mode": "Car", "strategy": "FASTEST", "stops": 100,
+                "info": {"starts": 1}, "stages": {"plan": 0.01}}
+               for _ in range(5)]
+    record = {"mode": "Car", "strategy": "FASTEST", "stops": 100,
+              "info": {"starts": 32}, "stages": {"plan": 0.4}}
+    result = check_regression(record, history)
+    assert result["regression"] is False
+    assert result["ratio"] is None
+
+
+def test_load_history_reads_only_the_tail(tmp_path):
+    """Only the last `limit` records of a long store are returned."""
+    import json
+    from CourierOptimizer.report import load_history
+
+    path = tmp_path / "history.jsonl"
+    path.write_text("".join(json.dumps({"run": i}) + "\n" for i in range(5000)))
+    records = load_history(path, limit=3)
+    assert [r["run"] for r in records] == [4997, 4998, 4999]
@@ -1,5 +1,14 @@
 # transport_mode.py
-from dataclasses import dataclass
+import csv
+import math
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from CourierOptimizer.config import SPEED_PROFILES_FILE
+
+HOURS_PER_DAY = 24
 
 
 @dataclass
@@ -8,11 +17,49 @@ class BaseTransportMode:
     speed: float
     cost: float
     co2: float
+    # optional time-of-day speed multipliers, one per hour 0..23
+    profile: Optional[Tuple[float, ...]] = None
+
+    def speed_at(self, hour):
+        """Return speed in km/h at the given clock hour (scalar or array)."""
+        if self.profile is None:
+            return self.speed
+        import numpy as np
+
+        bucket = np.floor(np.asarray(hour)).astype(int) % HOURS_PER_DAY
+        return self.speed * np.asarray(self.profile)[bucket]
 
     def travel_time(self, distance):
         """Return travel time in hours for the given distance."""
         return distance / self.speed
 
+    def eta_hours(self, cumulative_distance, depart_hour):
+        """
+        Return elapsed hours needed to cover each cumulative distance (km)
+        when leaving at depart_hour, following the speed profile.
+
+        The speed changes at every full hour, also in the middle of a leg.
+        Distance covered by time t is piecewise linear in t, so all ETAs of
+        a route are found with one interpolation instead of a loop over legs.
+        """
+        import numpy as np
+
+        cumulative_distance = np.asarray(cumulative_distance, dtype=float)
+        if self.profile is None:
+            return cumulative_distance / self.speed
+
+        total = float(cumulative_distance.max(initial=0.0))
+        slowest = self.speed * min(self.profile)
+        first_hour = math.floor(depart_hour)
+        n_hours = math.ceil(total / slowest) + 2
+        hours = first_hour + np.arange(n_hours + 1)
+        covered = np.concatenate(
+            ([0.0], np.cumsum(self.speed_at(hours[:-1])))
+        )
+        start = np.interp(depart_hour, hours, covered)
+        arrival = np.interp(start + cumulative_distance, covered, hours)
+        return arrival - depart_hour
+
     def travel_cost(self, distance):
         """Return travel cost in NOK for the given distance."""
         return distance * self.cost
@@ -22,6 +69,60 @@ class BaseTransportMode:
         return distance * self.co2
 
 
+def load_speed_profiles(path) -> Dict[str, Tuple[float, ...]]:
+    """
+    Read hourly speed multipliers from a CSV file with header
+    mode,hour,multiplier (e.g. "car,8,0.6").
+
+    Hours without a row keep multiplier 1.0. A missing file means no
+    profiles. Raises ValueError on malformed rows.
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    profiles: Dict[str, list] = {}
+    with open(path, newline="") as csvfile:
+        reader = csv.DictReader(csvfile)
+        for line_no, row in enumerate(reader, start=2):
+            try:
+                hour = int(row["hour"])
+                multiplier = float(row["multiplier"])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{path} line {line_no}: {e}") from e
+            if not 0 <= hour < HOURS_PER_DAY:
+                raise ValueError(f"{path} line {line_no}: hour must be in [0, 23]")
+            if multiplier <= 0:
+                raise ValueError(f"{path} line {line_no}: multiplier must be positive")
+            mode = row["mode"].strip().lower()
+            profiles.setdefault(mode, [1.0] * HOURS_PER_DAY)[hour] = multiplier
+    return {mode: tuple(values) for mode, values in profiles.items()}
+
+
+def with_speed_profile(transport_mode: BaseTransportMode, profiles, name: str):
+    """Return a copy of transport_mode using profiles[name], if present."""
+    if name not in profiles:
+        return transport_mode
+    return replace(transport_mode, profile=profiles[name])
+
+
 car = BaseTransportMode("Car", 50, 4, 120)
 bike = BaseTransportMode("Bicycle", 15, 0, 0)
 walk = BaseTransportMode("Walking", 5, 0, 0)
+
+MODES = {"car": car, "bike": bike, "walk": walk}
+
+
+@lru_cache(maxsize=None)
+def get_mode(name: str, profiles_path=SPEED_PROFILES_FILE) -> BaseTransportMode:
+    """
+    Return the transport mode called name (car / bike / walk) with its
+    speed profile from profiles_path applied (None: no profile).
+
+    Results are cached, so the profiles file is read once per process and
+    path; a running worker must be restarted to pick up edits.
+    """
+    if name not in MODES:
+        raise ValueError(f"Unknown transport mode: {name}")
+    if profiles_path is None:
+        return MODES[name]
+    return with_speed_profile(MODES[name], load_speed_profiles(profiles_path), name)
@@ -0,0 +1,100 @@
+# worker.py
+"""
+Persistent worker mode.
+
+A worker keeps one interpreter alive, with numpy and matplotlib already
+imported, and runs planning jobs sent to it over a local Unix socket.
+Short-lived callers (cron jobs) only pay for starting a small client.
+
+Protocol: the client sends one JSON object per connection (the fields of
+cli.Settings) terminated by a newline, and receives one JSON line back:
+{"ok": true, "summary": {...}} or {"ok": false, "error": "..."}.
+"""
+import json
+import os
+import socket
+import socketserver
+
+from CourierOptimizer.log import configure_run_log, get_logger
+
+logger = get_logger()
+
+
+def warm_up() -> None:
+    """Import the heavy dependencies once, before the first job arrives."""
+    import numpy  # noqa: F401
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+
+def run_job(job: dict):
+    """Run one job dict (cli.Settings fields) and return its summary."""
+    from CourierOptimizer.cli import Settings, execute
+
+    settings = Settings(**job)
+    return execute(settings)
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            job = json.loads(line)
+            response = {"ok": True, "summary": run_job(job)}
+        except Exception as e:
+            logger.exception("WORKER job failed: %s", line)
+            response = {"ok": False, "error": str(e)}
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+
+def _is_listening(socket_path: str) -> bool:
+    """Return True if something accepts connections on socket_path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(socket_path: str) -> None:
+    """
+    Serve jobs on socket_path until interrupted.
+
+    Jobs are handled one at a time, in arrival order, since a run writes
+    the shared route/plot output files.
+
+    Raises RuntimeError if another worker is already listening on
+    socket_path; a stale socket file left by a dead worker is replaced.
+    """
+    configure_run_log()
+    if os.path.exists(socket_path):
+        if _is_listening(socket_path):
+            raise RuntimeError(
+                f"another worker is already listening on {socket_path}"
+            )
+        os.remove(socket_path)
+    warm_up()
+    server = socketserver.UnixStreamServer(socket_path, _JobHandler)
+    logger.info("WORKER listening on %s (pid %d)", socket_path, os.getpid())
+    print(f"Worker listening on {socket_path} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        logger.info("WORKER stopped")
+
+
+def submit(socket_path: str, job: dict, timeout: float = None) -> dict:
+    """Send one job to a running worker and return its decoded response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(job) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as reader:
+            return json.loads(reader.readline())